@@ -13,9 +13,10 @@ where (xx) is a two digit number representing the problem's
 number. When all three of these files are found for a problem,
 a test method will be created (and added to a testing class) that
 will run the solution script with the input and check if
-the output is equivalent to the expected output. As soon
-as all test functions are created, unittest will be run and
-return the results.
+the output is equivalent to the expected output. By default
+every solution is run at once across a pool of worker processes
+and the failures are reported at the end; pass --unittest to
+create the test functions and run them through unittest instead.
 
 ---------- BEGIN LICENSE [MIT] ----------
 Copyright 2017 Ryan Drew
@@ -42,49 +43,58 @@ OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import sys
 import os
-import subprocess
+import io
+import runpy
+import traceback
 import logging
-import shutil
-import tempfile
 import re
 import difflib
 import unittest
+import functools
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
 
-REGEX_PATTERN = "Prob[0-9]{2}\.((in|out)\.txt|py)"
+REGEX_PATTERN = r"Prob\d{2}\.(?:in\.txt|out\.txt|py)\Z"
+_REG = re.compile(REGEX_PATTERN)
+# the three files of a complete problem: in file, out file, solution file
+Triple = namedtuple('Triple', 'in_ out_ py')
 LOG_FORMAT = \
     "%(asctime)s;FUNC:(%(funcName)s);LINENO:(%(lineno)d);%(levelname)s: %(message)s"
-# setup file logging
-# do basic config that includes logging to file 'test_cq.log' and to stream
-# if -v arg is passed level will be changed to INFO
-logging.basicConfig(level=logging.DEBUG, format=LOG_FORMAT)
+_LOG = logging.getLogger(__name__)
 
 
 def log_func_decorator(func):
     """
     Decorator to log the execution of a function: its start, end, output and execptions
+    Only does so when the logger is enabled for DEBUG.
     """
 
-    logger = logging.getLogger()
-
+    # wraps keeps the wrapped function's name so it can still be pickled
+    # and sent to worker processes
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        logger.info(
-            'Executing function "{}" (args: {}, kwargs: {})'.format(
-                func.__name__, args, kwargs)
+        # formatting the arguments and output is only worth it when debugging
+        if not _LOG.isEnabledFor(logging.DEBUG):
+            return func(*args, **kwargs)
+
+        _LOG.debug(
+            'Executing function "%s" (args: %s, kwargs: %s)',
+            func.__name__, args, kwargs
         )
 
         try:
             func_output = func(*args, **kwargs)
         except Exception as e:  # except any exception, log it than raise it
-            logger.warning(
-                'While executing function "{}", ' \
-                'exception was raised: "{}".'.format(func.__name__, str(e))
+            _LOG.debug(
+                'While executing function "%s", ' \
+                'exception was raised: "%s".', func.__name__, e
             )
             raise e
         else:
-            logger.info(
-                'Function "{}" execute successfully with ' \
-                'output: "{!r}"'.format(func.__name__, func_output)
+            _LOG.debug(
+                'Function "%s" execute successfully with ' \
+                'output: "%r"', func.__name__, func_output
             )
             return func_output
 
@@ -100,35 +110,22 @@ def get_cq_files(target_dir):
     :return: set() of the full paths to each file.
     """
 
-    # get logger
-    logger = logging.getLogger()
-
     # param checking
     if not (os.path.exists(target_dir) and os.path.isdir(target_dir)):
         raise OSError("Given target directory '{}' either does not" \
                       "exist or is not a directory.".format(target_dir))
     # if param checks out, then keep going
 
-    # setup regular expression object
-    logger.debug('Using regex pattern: "{}"'.format(REGEX_PATTERN))
-    reg_pattern = re.compile(REGEX_PATTERN)
-
-    # return all matches as a set
-    """
-    This is cool, but can't log anything :(
-    return {  # a '/' works on both linux and windows
-        "{}/{}".format(target_dir, f) for f in os.listdir(target_dir) if \
-        reg_pattern.match(f)
-    }
-    """
+    _LOG.debug('Using regex pattern: "%s"', REGEX_PATTERN)
 
+    # return all matches as a set. scandir gives back the file type with
+    # each entry, so directories can be skipped without an extra stat
     matched = set()
-    for f in os.listdir(target_dir):
-        if reg_pattern.match(f):
-            logger.debug('Matched regex: "{}"'.format(f))
-            matched.add(f)
-        else:
-            logger.debug('Did not match regex: "{}"'.format(f))
+    with os.scandir(target_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and _REG.match(entry.name):
+                _LOG.debug('Matched regex: "%s"', entry.path)
+                matched.add(entry.path)
     return matched
 
 
@@ -137,36 +134,69 @@ def group_cq_files(cq_files):
     """
     Groups the three different types of code quest files by their problem
     number into a dictionary. The keys are integears representing the problem
-    number, the values are a list of the associated files.
+    number, the values are a Triple of the associated files. Problems that
+    are missing any of their three files are left out.
     :param cq_files: Iterator of Code Quest files.
-    :return: {int(Problem number): [(Prob(xx).in.txt), (Prob(xx).out.txt),
-            (Prob(xx).py)]}
+    :return: {int(Problem number): Triple((Prob(xx).in.txt),
+            (Prob(xx).out.txt), (Prob(xx).py))}
     """
 
-    # get logger
-    logger = logging.getLogger()
-
     # x will be file path, so get the filename and then find the problem number
     # at indexes 4-5.
     get_prob_num = lambda x: os.path.basename(x)[4:6]
-    grouped = dict()
+    grouped = defaultdict(lambda: [None, None, None])
     for cq_file in cq_files:
         _prob_num = int(get_prob_num(cq_file))
-        logger.debug(
-            "Placing '{}' (problem number: {})".format(cq_file, _prob_num)
+        # slot the file into its place in the Triple by its suffix
+        _slot = 0 if cq_file.endswith('.in.txt') else \
+            1 if cq_file.endswith('.out.txt') else 2
+        _LOG.debug(
+            "Placing '%s' (problem number: %s)", cq_file, _prob_num
         )
-        try:
-            grouped.get(_prob_num).append(cq_file)
-        except:
-            grouped[_prob_num] = [cq_file]
-            logger.debug(
-                "Created new list for problem number {}".format(_prob_num)
-            )
+        grouped[_prob_num][_slot] = cq_file
 
-    return grouped
+    return {
+        prob_num: Triple(*files) for prob_num, files in grouped.items()
+        if None not in files
+    }
+
+
+def _run_solution(in_file, solution_file):
+    """
+    Runs solution_file as __main__ in this process with in_file as stdin
+    and the directory of in_file as the working directory.
+    :return: (bytes written to stdout, str written to stderr or the
+            traceback of an uncaught exception)
+    """
+
+    # write_through keeps print() and sys.stdout.buffer writes in order
+    stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8',
+                              write_through=True)
+    stderr = io.StringIO()
+    solution_file = os.path.abspath(solution_file)
+    old = sys.stdin, sys.stdout, sys.stderr, sys.argv, sys.path[:], os.getcwd()
+    try:
+        with open(in_file, 'r') as stdin:
+            sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+            # mirror what the interpreter sets up for a script
+            sys.argv = [solution_file]
+            sys.path.insert(0, os.path.dirname(solution_file))
+            os.chdir(os.path.dirname(os.path.abspath(in_file)))
+            try:
+                runpy.run_path(solution_file, run_name='__main__')
+            except SystemExit as e:
+                if e.code not in (None, 0):
+                    stderr.write("SystemExit: {}\n".format(e.code))
+            except Exception:
+                stderr.write(traceback.format_exc())
+            stdout.flush()
+    finally:
+        sys.stdin, sys.stdout, sys.stderr, sys.argv, sys.path[:], cwd = old
+        os.chdir(cwd)
+
+    return stdout.buffer.getvalue(), stderr.getvalue()
 
 
-@log_func_decorator
 def check_solution(in_file, out_file, solution_file):
     """
     Runs the given solution file, passing it the input of in_file
@@ -179,89 +209,93 @@ def check_solution(in_file, out_file, solution_file):
             incorrect, otherwise None.
     """
 
-    # get logger and log arguments
-    logger = logging.getLogger()
-    logger.info('Solution file: "{}"'.format(solution_file))
+    # log arguments
+    _LOG.info('Solution file: "%s"', solution_file)
     for file_name, file in (("Input", in_file), ("Expected out", out_file)):
-        with open(file, 'r') as f:
-            # reading the input in as lines makes it easier to work with
+        with open(file, 'rb') as f:
             # the out files have \r in them at the end of every newline
             # remove them because they are annoying and break correct
-            # solutions
-            f_contents = f.read().replace('\r', '').splitlines(True)
-            logger.debug('{} file contents:\n{!r}'.format(file_name,
-                                                          f_contents))
+            # solutions. the contents are kept as bytes so they can be
+            # compared directly to the solution's output
+            f_contents = f.read().replace(b'\r', b'')
+            _LOG.debug('%s file contents:\n%r', file_name, f_contents)
             if file == out_file:  # we want to save this for later
                 expected_out = f_contents
-    # in_file and solution_file must be in the same directory, so if they
-    # aren't then create a temporary directory and move them both there
-    if os.path.dirname(in_file) != os.path.dirname(solution_file):
-        # define tmpdir outside of manager, so the directory isn't destroyed
-        tmpdir = tempfile.TemporaryDirectory()
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            for file in (in_file, out_file):
-                shutil.copyfile(file, tmpdirname)
-            in_file = "{}/{}".format(os.path.basename(in_file), tmpdirname)
-            solution_file = "{}/{}".format(os.path.basename(solution_file),
-                                           tmpdirname)
-
-    # run the solution file using subprocess and then catch its output
-    path_to_python = sys.executable
-    logger.info("Using python interpreter at: '{}'".format(path_to_python))
-    logger.info(
-        "Executing solution file '{}'".format(os.path.basename(solution_file))
+
+    # run the solution file inside this interpreter and then catch its
+    # output. solutions open their input by a relative path, so run them
+    # from the directory holding in_file; the input is also given on stdin
+    # for solutions that read from there instead.
+    _LOG.info(
+        "Executing solution file '%s'", os.path.basename(solution_file)
     )
-    p = subprocess.Popen('"{}" {}'.format(path_to_python, solution_file),
-                         shell=True, stdout=subprocess.PIPE,
-                         stderr=subprocess.PIPE)
-    # returned from the read is a bytes string so decode it.
-    out, err = (x.decode('utf-8') for x in p.communicate())
+    # returned from the run is a bytes string, it is compared as bytes.
+    out, err = _run_solution(in_file, solution_file)
     if len(err) != 0:  # if an error was raised
         raise Exception(
             "An error occurred while executing '{}': '{}'".format(
                 os.path.basename(solution_file), err)
         )
     else:
-        out = out.replace('\r', '').splitlines(True)
-        logger.debug('Got output:\n{!r}'.format(out))
+        out = out.replace(b'\r', b'')
+        _LOG.debug('Got output:\n%r', out)
 
         # find differences between retrieved output and expected output
-        logger.info("Comparing output to expected output.")
-        diffs = difflib.Differ().compare(out, expected_out)
-        for line_no, diff in enumerate(diffs, 1):  # starts coutning line number at 1
-
-            if not diff.startswith(" "):  # if the lines differ in some way:
-                error_file = in_file.replace("in", "error")
-                logger.error(
-                    "Difference found at line {}, writing output to disk " \
-                    "at: {}".format(line_no, error_file)
-                )
-
-                with open(error_file, 'w') as f:
-                    f.write(''.join(out))
-
-                """
-                it's worth mentioning that whenever a difference is found
-                using difflib this format is used:
-                ' - (output from solution)'
-                ' ? (location of difference)'
-                ' + (expected output)'
-                NOTE: (sometimes the ? and + lines are switched)
-                In the below error, all spaces in the + and ? lines are
-                replaced with ^s for readability
-                """
-                raise AssertionError(
-                    "Solution '{}' failed at line {}: {!r} (difference: " \
-                    " {!r}, expected: {!r}). Wrote incorrect output " \
-                    "to {}".format(
-                        os.path.basename(solution_file), line_no, diff,
-                        next(diffs).replace(" ", "^"),
-                        next(diffs).replace(" ", "^"),
-                        error_file
-                    )
-                )
-        logger.info(
-            "Success! {} passed".format(os.path.basename(solution_file))
+        _LOG.info("Comparing output to expected output.")
+        if out == expected_out:
+            _LOG.info(
+                "Success! %s passed", os.path.basename(solution_file)
+            )
+            return
+
+        # in_file is a full path now, so only rename the file itself
+        error_file = os.path.join(
+            os.path.dirname(in_file),
+            os.path.basename(in_file).replace(".in.", ".error.")
+        )
+        with open(error_file, 'wb') as f:
+            f.write(out)
+
+        # the output is known to be wrong, so split both into lines for difflib
+        out = out.decode('utf-8').splitlines(True)
+        expected_out = expected_out.decode('utf-8').splitlines(True)
+
+        """
+        only build a diff when the output is known to be wrong. whenever a
+        difference is found the unified diff format is used:
+        '@@ -(expected start),(len) +(output start),(len) @@'
+        ' (context line)'
+        '-(expected output)'
+        '+(output from solution)'
+        the line number of the first difference is taken from the hunk
+        header plus the number of context lines before it.
+        """
+        diff_lines = list(difflib.unified_diff(expected_out, out, n=1))
+        line_no, expected, got = 0, None, None
+        for diff in diff_lines[2:]:  # skip the '---' and '+++' headers
+            if diff.startswith("@@"):
+                line_no = int(diff.split()[1].lstrip("-").split(",")[0])
+            elif diff.startswith(" "):
+                if expected is not None or got is not None:
+                    break  # end of the first block of differences
+                line_no += 1
+            elif diff.startswith("-") and expected is None:
+                expected = diff[1:]
+            elif diff.startswith("+") and got is None:
+                got = diff[1:]
+        # an empty expected file yields a hunk header of 0
+        line_no = max(line_no, 1)
+
+        _LOG.error(
+            "Difference found at line %s, writing output to disk " \
+            "at: %s", line_no, error_file
+        )
+        raise AssertionError(
+            "Solution '{}' failed at line {}: {!r} (expected: {!r}). " \
+            "Wrote incorrect output to {}".format(
+                os.path.basename(solution_file), line_no, got, expected,
+                error_file
+            )
         )
 
 
@@ -277,27 +311,70 @@ def create_test_funcs(grouped_cq_files):
     will be added as methods into the TestSolutions class.
     """
 
-    def _create_test_method(cq_files):
-        def check_solution_method(self):
-            check_solution(*cq_files)
-        return check_solution_method
-
     for prob_num, cq_files in grouped_cq_files.items():
-        # in file, out file, solution file
-        if len(cq_files) == 3:
-            cq_files = sorted(cq_files)
-            logging.getLogger().info(cq_files)
+        _LOG.info(cq_files)
+        setattr(
+            TestSolutions, "test_prob{:02d}".format(prob_num),
+            lambda self, files=tuple(cq_files): check_solution(*files)
+        )
 
-            setattr(
-                TestSolutions, "test_prob{:02d}".format(prob_num), _create_test_method(cq_files)
-            )
+
+def run_parallel(grouped_cq_files):
+    """
+    Runs check_solution for every complete problem at once, spreading the
+    solutions across a pool of worker processes. Failures are collected and
+    reported after every solution has finished.
+    :param grouped_cq_files: Output of group_cq_files.
+    :return: Number of solutions that failed.
+    """
+
+    if not grouped_cq_files:
+        print("No complete problems found.")
+        return 0
+
+    failures = dict()
+    max_workers = min(len(grouped_cq_files), os.cpu_count() or 1)
+    _LOG.info("Running %s solutions on %s workers", len(grouped_cq_files),
+              max_workers)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            prob_num: executor.submit(check_solution, *cq_files)
+            for prob_num, cq_files in grouped_cq_files.items()
+        }
+        for prob_num, future in sorted(futures.items()):
+            try:
+                future.result()
+            except Exception as e:
+                failures[prob_num] = e
+
+    for prob_num, e in sorted(failures.items()):
+        print("FAIL: prob{:02d}: {}".format(prob_num, e))
+    print("Ran {} solutions, {} failed".format(len(grouped_cq_files),
+                                               len(failures)))
+    return len(failures)
 
 
 def main():
+    # logging is set up here, only WARNING and above are logged unless
+    # -v (INFO) or -vv (DEBUG) is passed
+    if "-vv" in sys.argv:
+        level = logging.DEBUG
+    elif "-v" in sys.argv:
+        level = logging.INFO
+    else:
+        level = logging.WARNING
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+
     cq_files = get_cq_files(os.getcwd())
     grouped = group_cq_files(cq_files)
-    create_test_funcs(grouped)
-    unittest.main()
+    # solutions are run in parallel unless --unittest is given, in which
+    # case a test method is created for each one and run through unittest
+    if "--unittest" in sys.argv:
+        sys.argv.remove("--unittest")
+        create_test_funcs(grouped)
+        unittest.main()
+    else:
+        sys.exit(1 if run_parallel(grouped) else 0)
 
 
 if __name__ == "__main__":